@@ -1,7 +1,8 @@
+import json
+
+import numpy as np
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 
 # -----------------------------------------------------------------------------
 # 1. 기본 설정
@@ -37,24 +38,17 @@ ACADEMY_DATA = {
 @st.cache_data
 def load_and_process_data():
     try:
-        # 1. 인구 데이터 로드
-        df_pop_raw = pd.read_excel('data/population_2023.xlsx', engine='openpyxl')
-        df_pop = df_pop_raw[df_pop_raw['성별'] == '계'].copy()
-
-        target_year = '2024' if '2024' in [str(c) for c in df_pop.columns] else '2023'
-        if target_year not in df_pop.columns: target_year = int(target_year)
+        # 1. 인구 데이터 로드 (scripts/prebuild.py로 엑셀에서 미리 추출한 자치구별 연령 구간)
+        with open('data/pop_buckets.json', encoding='utf-8') as f:
+            pop_buckets = json.load(f)
 
-        df_pivot = df_pop.pivot(index='행정구역(시군구)별', columns='연령별', values=target_year)
-        df_pivot.index = df_pivot.index.str.strip()
+        # 가격·학원 데이터가 모두 있는 구만 사용
+        regions = [r for r in pop_buckets if r in PRICE_DATA_2024 and r in ACADEMY_DATA]
+        ages = np.array([[pop_buckets[r][k] for k in ('0_4', '5_9', '10_14', '15_19')] for r in regions])
+        total_pop = np.array([pop_buckets[r]['total'] for r in regions])
 
         # 2. 연령대별 세분화 (핵심 로직)
         # 영유아(0-6), 초등(7-12), 중고등(13-18)
-        cols = [str(c) for c in df_pivot.columns]
-
-        # 컬럼 매핑 (데이터 컬럼명에 따라 유연하게 처리)
-        def get_sum(keyword_list):
-            target_cols = [c for c in df_pivot.columns if any(k in str(c) for k in keyword_list)]
-            return df_pivot[target_cols].sum(axis=1)
 
         # 5세 단위 데이터를 활용한 근사치 계산
         # 0-4세 + 5-9세의 절반 -> 영유아(0~6)
@@ -62,29 +56,45 @@ def load_and_process_data():
         # 10-14세의 절반 + 15-19세의 80% -> 중고등(13~18)
         # *정확한 나이별 데이터가 없으므로 구간 비율로 추정
 
-        col_0_4 = get_sum(['0 - 4세'])
-        col_5_9 = get_sum(['5 - 9세'])
-        col_10_14 = get_sum(['10 - 14세'])
-        col_15_19 = get_sum(['15 - 19세'])
-
-        df_pivot['infant'] = col_0_4 + (col_5_9 * 0.4)  # 0~6세
-        df_pivot['elementary'] = (col_5_9 * 0.6) + (col_10_14 * 0.6)  # 7~12세
-        df_pivot['adolescent'] = (col_10_14 * 0.4) + (col_15_19 * 0.8)  # 13~18세 (입시생)
-
-        df_pivot['total_pop'] = df_pivot['계']
+        # 행: 0-4세, 5-9세, 10-14세, 15-19세 / 열: 영유아(0~6), 초등(7~12), 중고등(13~18, 입시생)
+        age_weights = np.array([
+            [1.0, 0.0, 0.0],
+            [0.4, 0.6, 0.0],
+            [0.0, 0.6, 0.4],
+            [0.0, 0.0, 0.8],
+        ])
+        derived = ages @ age_weights
 
         # 비율 계산
-        df_pivot['ratio_infant'] = (df_pivot['infant'] / df_pivot['total_pop']) * 100
-        df_pivot['ratio_elem'] = (df_pivot['elementary'] / df_pivot['total_pop']) * 100
-        df_pivot['ratio_adol'] = (df_pivot['adolescent'] / df_pivot['total_pop']) * 100
-        df_pivot['ratio_total_youth'] = df_pivot['ratio_infant'] + df_pivot['ratio_elem'] + df_pivot['ratio_adol']
-
-        # 3. 외부 데이터 병합 (가격, 학원)
-        df_price = pd.DataFrame(list(PRICE_DATA_2024.items()), columns=['region', 'price'])
-        df_academy = pd.DataFrame(list(ACADEMY_DATA.items()), columns=['region', 'academy_count'])
-
-        merged = pd.merge(df_price, df_pivot, left_on='region', right_index=True, how='inner')
-        merged = pd.merge(merged, df_academy, on='region', how='inner')
+        ratios = derived / total_pop[:, None] * 100
+
+        # 3. 외부 데이터 결합 (가격, 학원) - 계산은 numpy로 끝내고 표/차트용 DataFrame은 마지막에 한 번만 생성
+        merged = pd.DataFrame({
+            'region': pd.Categorical(regions),  # 25개 값뿐인 키 컬럼이므로 범주형으로 저장
+            'price': [PRICE_DATA_2024[r] for r in regions],
+            'academy_count': [ACADEMY_DATA[r] for r in regions],
+            'total_pop': total_pop,
+            'infant': derived[:, 0],
+            'elementary': derived[:, 1],
+            'adolescent': derived[:, 2],
+            'ratio_infant': ratios[:, 0],
+            'ratio_elem': ratios[:, 1],
+            'ratio_adol': ratios[:, 2],
+            'ratio_total_youth': ratios.sum(axis=1),
+        })
+
+        # 4. 집값과의 상관계수 (캐시와 함께 저장되어 리런마다 다시 계산하지 않음)
+        corrs = merged[['ratio_infant', 'ratio_elem', 'ratio_adol', 'academy_count']].corrwith(merged['price'])
+        merged.attrs['corrs'] = corrs.to_dict()
+
+        # 5. 학원 산점도에 이름을 표시할 특징적인 구
+        merged['show_label'] = (merged['academy_count'] > 500) | (merged['price'] > 5000)
+
+        # 6. 산점도 추세선 (1차 최소제곱 기울기/절편)
+        merged.attrs['trends'] = {
+            x: tuple(float(v) for v in np.polyfit(merged[x], merged['price'], 1))
+            for x in ('ratio_adol', 'academy_count')
+        }
 
         return merged
 
@@ -94,7 +104,86 @@ def load_and_process_data():
 
 
 # -----------------------------------------------------------------------------
-# 4. 메인 대시보드 UI
+# 4. 차트/표 생성 함수
+# -----------------------------------------------------------------------------
+def make_corr_table(df):
+    # 연령대별 집값 상관계수 표 (로드 시 계산된 값)
+    corrs = df.attrs['corrs']
+    return pd.DataFrame({
+        '연령대': ['영유아 (0~6세)', '초등학생 (7~12세)', '중고등학생 (13~18세)'],
+        '상관계수': [corrs['ratio_infant'], corrs['ratio_elem'], corrs['ratio_adol']],
+        '설명': ['보육 중심', '학군 형성기', '본격 입시 학군']
+    })
+
+
+def add_trendline(fig, df, x):
+    # 로드 시 계산된 추세선을 x 범위 양 끝을 잇는 직선으로 추가
+    import plotly.graph_objects as go
+
+    slope, intercept = df.attrs['trends'][x]
+    x_range = [df[x].min(), df[x].max()]
+    fig.add_trace(go.Scatter(x=x_range, y=[slope * v + intercept for v in x_range],
+                             mode='lines', name='OLS', showlegend=False))
+
+
+@st.cache_resource
+def build_figs(df):
+    # 입력 데이터가 고정이므로 차트는 프로세스당 한 번만 생성하고 리런 시 재사용
+    # (plotly는 데이터 로드에 성공해 차트를 그릴 때에만 import)
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    # 막대 차트로 상관계수 비교
+    fig_bar = px.bar(make_corr_table(df), x='연령대', y='상관계수', color='상관계수',
+                     color_continuous_scale='Bluered',
+                     title="연령대별 집값과의 상관계수 비교")
+    fig_bar.update_traces(texttemplate='%{y:.2f}', textposition='outside', cliponaxis=False)
+    fig_bar.update_layout(height=400)
+
+    # 산점도: 중고등학생 비율 vs 집값
+    fig_scatter = px.scatter(df, x='ratio_adol', y='price', size='total_pop',
+                             color='price', hover_name='region', render_mode='webgl',
+                             labels={'ratio_adol': '중고등학생(입시생) 인구 비율(%)', 'price': '평당 가격(만원)'},
+                             title="입시생(13~18세) 비율과 집값의 상관관계")
+    add_trendline(fig_scatter, df, 'ratio_adol')
+
+    # 산점도: 학원 수 vs 집값
+    fig_academy = px.scatter(df, x='academy_count', y='price', size='ratio_adol',
+                             color='price', hover_name='region', render_mode='webgl',
+                             color_continuous_scale='Viridis',
+                             labels={'academy_count': '사설학원 수 (개)', 'price': '평당 가격(만원)',
+                                     'ratio_adol': '입시생 비율'},
+                             title="서울시 자치구별 학원 수 vs 아파트 평당 가격")
+    add_trendline(fig_academy, df, 'academy_count')
+    # 주요 구 텍스트 추가 (특징적인 구만 하나의 텍스트 trace로 표시)
+    labeled = df[df['show_label']]
+    fig_academy.add_trace(go.Scatter(x=labeled['academy_count'], y=labeled['price'], text=labeled['region'],
+                                     mode='text', textposition='top center',
+                                     hoverinfo='skip', showlegend=False))
+
+    return {'bar': fig_bar, 'scatter': fig_scatter, 'academy': fig_academy}
+
+
+@st.cache_data
+def render_table(df):
+    # 종합 데이터 표를 HTML로 한 번만 렌더링 (Styler의 템플릿 렌더링이 가장 비싼 단계)
+    return (
+        df[['region', 'price', 'academy_count', 'ratio_infant', 'ratio_elem', 'ratio_adol']]
+        .sort_values(by='price', ascending=False)
+        .style.format({
+            'price': '{:,.0f} 만원',
+            'academy_count': '{:,.0f} 개',
+            'ratio_infant': '{:.2f}%',
+            'ratio_elem': '{:.2f}%',
+            'ratio_adol': '{:.2f}%'
+        })
+        .background_gradient(subset=['price', 'academy_count', 'ratio_adol'], cmap='Reds')
+        .to_html()
+    )
+
+
+# -----------------------------------------------------------------------------
+# 5. 메인 대시보드 UI
 # -----------------------------------------------------------------------------
 st.title("🏙️ 서울 부동산 딥다이브: 입시와 집값의 연결고리")
 st.markdown("""
@@ -107,6 +196,8 @@ st.divider()
 df = load_and_process_data()
 
 if not df.empty:
+    figs = build_figs(df)
+
     # 탭 구성
     tab1, tab2, tab3 = st.tabs(["👶 연령별 상관분석", "🏫 학원 인프라 효과", "📊 종합 데이터"])
 
@@ -118,26 +209,11 @@ if not df.empty:
         col_c1, col_c2 = st.columns([3, 1])
 
         with col_c1:
-            # 상관계수 계산
-            corr_infant = df['ratio_infant'].corr(df['price'])
-            corr_elem = df['ratio_elem'].corr(df['price'])
-            corr_adol = df['ratio_adol'].corr(df['price'])
-
-            # 막대 차트로 상관계수 비교
-            corr_data = pd.DataFrame({
-                '연령대': ['영유아 (0~6세)', '초등학생 (7~12세)', '중고등학생 (13~18세)'],
-                '상관계수': [corr_infant, corr_elem, corr_adol],
-                '설명': ['보육 중심', '학군 형성기', '본격 입시 학군']
-            })
-
-            fig_bar = px.bar(corr_data, x='연령대', y='상관계수', color='상관계수',
-                             color_continuous_scale='Bluered', text_auto='.2f',
-                             title="연령대별 집값과의 상관계수 비교")
-            fig_bar.update_layout(height=400)
-            st.plotly_chart(fig_bar, use_container_width=True)
+            st.plotly_chart(figs['bar'], use_container_width=True)
 
         with col_c2:
             st.info("💡 **분석 결과**")
+            corr_data = make_corr_table(df)
             max_corr = corr_data.loc[corr_data['상관계수'].idxmax()]
             st.write(f"가장 강력한 요인: **{max_corr['연령대']}**")
 
@@ -150,12 +226,7 @@ if not df.empty:
             else:
                 st.write("연령대별 차이가 크지 않거나 다른 요인이 작용하고 있습니다.")
 
-        # 산점도: 중고등학생 비율 vs 집값
-        fig_scatter = px.scatter(df, x='ratio_adol', y='price', size='total_pop',
-                                 color='price', hover_name='region', trendline='ols',
-                                 labels={'ratio_adol': '중고등학생(입시생) 인구 비율(%)', 'price': '평당 가격(만원)'},
-                                 title="입시생(13~18세) 비율과 집값의 상관관계")
-        st.plotly_chart(fig_scatter, use_container_width=True)
+        st.plotly_chart(figs['scatter'], use_container_width=True)
 
     # [TAB 2] 학원 수와 집값
     with tab2:
@@ -163,23 +234,11 @@ if not df.empty:
         col_a1, col_a2 = st.columns([3, 1])
 
         with col_a1:
-            fig_academy = px.scatter(df, x='academy_count', y='price', size='ratio_adol',
-                                     color='price', hover_name='region', trendline='ols',
-                                     color_continuous_scale='Viridis',
-                                     labels={'academy_count': '사설학원 수 (개)', 'price': '평당 가격(만원)',
-                                             'ratio_adol': '입시생 비율'},
-                                     title="서울시 자치구별 학원 수 vs 아파트 평당 가격")
-            # 주요 구 텍스트 추가
-            for i, row in df.iterrows():
-                if row['academy_count'] > 500 or row['price'] > 5000:  # 특징적인 구만 표시
-                    fig_academy.add_annotation(x=row['academy_count'], y=row['price'], text=row['region'],
-                                               showarrow=False, yshift=10)
-
-            st.plotly_chart(fig_academy, use_container_width=True)
+            st.plotly_chart(figs['academy'], use_container_width=True)
 
         with col_a2:
             st.success("🏫 **인프라 분석**")
-            corr_academy = df['academy_count'].corr(df['price'])
+            corr_academy = df.attrs['corrs']['academy_count']
             st.metric("상관계수 (학원-집값)", f"{corr_academy:.2f}")
 
             st.markdown("""
@@ -190,18 +249,7 @@ if not df.empty:
 
     # [TAB 3] 데이터 상세
     with tab3:
-        st.dataframe(
-            df[['region', 'price', 'academy_count', 'ratio_infant', 'ratio_elem', 'ratio_adol']]
-            .sort_values(by='price', ascending=False)
-            .style.format({
-                'price': '{:,.0f} 만원',
-                'academy_count': '{:,.0f} 개',
-                'ratio_infant': '{:.2f}%',
-                'ratio_elem': '{:.2f}%',
-                'ratio_adol': '{:.2f}%'
-            })
-            .background_gradient(subset=['price', 'academy_count', 'ratio_adol'], cmap='Reds')
-        )
+        st.markdown(render_table(df), unsafe_allow_html=True)
 else:
 
     st.error("데이터 로드 실패. data 폴더를 확인해주세요.")
@@ -0,0 +1,66 @@
+# -----------------------------------------------------------------------------
+# 인구 엑셀 -> data/pop_buckets.json 사전 추출 스크립트
+# -----------------------------------------------------------------------------
+# 앱은 서울 25개 자치구의 0~19세 5세 구간 인구와 총인구만 사용하므로,
+# 엑셀 파싱/피벗은 데이터가 바뀔 때 한 번만 실행하고 결과 JSON을 커밋합니다.
+#
+# 실행: python scripts/prebuild.py  (python-calamine 또는 openpyxl 필요)
+import json
+import os
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_PATH = os.path.join(ROOT, 'data', 'population_2023.xlsx')
+OUT_PATH = os.path.join(ROOT, 'data', 'pop_buckets.json')
+
+# JSON 키 -> 엑셀 '연령별' 값
+AGE_BUCKETS = {
+    '0_4': '0 - 4세',
+    '5_9': '5 - 9세',
+    '10_14': '10 - 14세',
+    '15_19': '15 - 19세',
+}
+
+# 읽어 올 컬럼 (연도 헤더는 숫자로 읽힐 수도 있으므로 문자열로 비교)
+SRC_COLUMNS = {'행정구역(시군구)별', '성별', '연령별', '2023', '2024'}
+
+
+def build_buckets():
+    # 1. 인구 데이터 로드 (첫 시트의 필요한 컬럼만, calamine이 없으면 openpyxl로 대체)
+    read_kwargs = {'sheet_name': 0, 'usecols': lambda c: str(c) in SRC_COLUMNS}
+    try:
+        df_pop_raw = pd.read_excel(SRC_PATH, engine='calamine', **read_kwargs)
+    except (ImportError, ValueError):
+        df_pop_raw = pd.read_excel(SRC_PATH, engine='openpyxl', **read_kwargs)
+
+    # 시도 행(들여쓰기 없음) 아래의 시군구만 남김 -> 서울특별시 자치구
+    regions = df_pop_raw['행정구역(시군구)별']
+    is_child = regions.str.startswith('　')
+    province = regions.where(~is_child).ffill()
+    df_pop_raw = df_pop_raw[is_child & (province == '서울특별시')]
+
+    # 피벗 전에 필요한 연령 구간(+ 총계) 행만 남김
+    needed_ages = [*AGE_BUCKETS.values(), '계']
+    df_pop = df_pop_raw[df_pop_raw['성별'].eq('계') & df_pop_raw['연령별'].isin(needed_ages)]
+
+    # 최신 연도 우선, 헤더가 숫자/문자 어느 쪽으로 읽혀도 원래 타입 그대로 사용
+    cols = set(df_pop.columns)
+    target_year = next(y for y in (2024, '2024', 2023, '2023') if y in cols)
+
+    df_pivot = df_pop.pivot(index='행정구역(시군구)별', columns='연령별', values=target_year)
+    df_pivot.index = df_pivot.index.str.strip()
+
+    # 필요한 구간만 피벗했으므로 컬럼을 그대로 골라 JSON 키 이름으로 변경
+    columns = {label: key for key, label in AGE_BUCKETS.items()} | {'계': 'total'}
+    buckets = df_pivot[list(columns)].rename(columns=columns)
+
+    return buckets.to_dict(orient='index')
+
+
+if __name__ == '__main__':
+    buckets = build_buckets()
+    with open(OUT_PATH, 'w', encoding='utf-8') as f:
+        json.dump(buckets, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    print(f"{len(buckets)}개 자치구 -> {OUT_PATH}")